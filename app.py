@@ -1,35 +1,144 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
 import osmnx as ox
-import networkx as nx
+from scipy.spatial import cKDTree
 from flask import Flask, request, jsonify
 
+from contraction_hierarchy import load_ch
+from graph_store import CH_FILE, GRAPH_FILE, build_csr, build_node_arrays, load_graph
+from solver_kernels import (a_star_alt_solve, ch_solve, dijkstra_all, dijkstra_bi_solve, dijkstra_solve,
+                            path_length)
+
 app = Flask(__name__)
 
-GRAPH_FILE = os.path.join(os.path.dirname(__file__), "mumbai.graphml")
+NUM_LANDMARKS = 16
+
+def build_node_tree(latlon):
+    """
+    KD-tree over node positions for nearest-node snapping, in radians.
+    Longitude is scaled by cos(mean latitude) so euclidean distance matches
+    ground distance at city scale. Returns (tree, lon_scale).
+    """
+    lat, lon = np.radians(latlon[:, 0]), np.radians(latlon[:, 1])
+    lon_scale = float(np.cos(lat.mean()))
+    return cKDTree(np.column_stack([lon * lon_scale, lat])), lon_scale
+
+def build_landmarks(csr, rev_csr, k=NUM_LANDMARKS):
+    """
+    Pick k landmarks by farthest-point sampling and return their exact
+    distances for the ALT heuristic as two float32 (N, k) arrays:
+    distances from each landmark and distances to each landmark.
+    """
+    n = len(csr[0]) - 1
+    k = min(k, n)
+    lm_from = np.empty((n, k), dtype=np.float32)
+    lm_to = np.empty((n, k), dtype=np.float32)
+
+    # Start from the node farthest from an arbitrary one, then keep adding
+    # the node farthest from every landmark chosen so far
+    reach = dijkstra_all(*csr, 0)
+    landmark = int(np.argmax(np.where(np.isfinite(reach), reach, -1.0)))
+    nearest = np.full(n, np.inf)
+    for j in range(k):
+        lm_from[:, j] = dijkstra_all(*csr, landmark)
+        lm_to[:, j] = dijkstra_all(*rev_csr, landmark)
+        nearest = np.minimum(nearest, lm_from[:, j])
+        landmark = int(np.argmax(np.where(np.isfinite(nearest), nearest, -1.0)))
+    return lm_from, lm_to
 
-def load_graph():
+def load_contraction_hierarchy(csr):
     """
-    Load Mumbai road network.
-    If graphml file exists, load it.
-    If not, download and save it for future use.
+    Load the contraction hierarchy for the current graph file.
+    It is built offline with `python contraction_hierarchy.py`; if it is
+    missing, stale or unreadable, return None so only the CH solver is
+    left out.
     """
-    if os.path.exists(GRAPH_FILE):
-        print(f"Loading graph from {GRAPH_FILE} ...")
-        return ox.load_graphml(GRAPH_FILE)
-    else:
-        print("Graph file not found, downloading from OSM...")
-        G = ox.graph_from_place("Mumbai, India", network_type="drive")
-        ox.save_graphml(G, GRAPH_FILE)
-        print("Graph downloaded and saved.")
-        return G
+    if not os.path.exists(CH_FILE):
+        print(f"Contraction hierarchy not found, run `python contraction_hierarchy.py` to build {CH_FILE}")
+        return None
+    if os.path.getmtime(CH_FILE) < os.path.getmtime(GRAPH_FILE):
+        print(f"Contraction hierarchy is older than {GRAPH_FILE}, run `python contraction_hierarchy.py` to rebuild it")
+        return None
+    print(f"Loading contraction hierarchy from {CH_FILE} ...")
+    try:
+        up, down = load_ch(CH_FILE)
+    except Exception as e:
+        print(f"❌ Could not load contraction hierarchy: {e}")
+        return None
+    if len(up[0]) != len(csr[0]):
+        print("Contraction hierarchy does not match the graph, run `python contraction_hierarchy.py` to rebuild it")
+        return None
+    return up, down
 
 # Global graph object
 try:
     G = load_graph()
+    NODE_INDEX, NODE_LATLON = build_node_arrays(G)
+    NODE_TREE, NODE_TREE_LON_SCALE = build_node_tree(NODE_LATLON)
+    CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS = build_csr(G, NODE_INDEX)
+    REV_INDPTR, REV_INDICES, REV_WEIGHTS = build_csr(G, NODE_INDEX, reverse=True)
+    LANDMARKS_FROM, LANDMARKS_TO = build_landmarks((CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS),
+                                                   (REV_INDPTR, REV_INDICES, REV_WEIGHTS))
+    CH = load_contraction_hierarchy((CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS))
+
+    # Solver name -> (kernel, graph arrays passed ahead of start/end)
+    SOLVERS = {
+        "Dijkstra": (dijkstra_solve, (CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS)),
+        "Bidirectional Dijkstra": (dijkstra_bi_solve, (CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS,
+                                                       REV_INDPTR, REV_INDICES, REV_WEIGHTS)),
+        "A* (ALT)": (a_star_alt_solve, (CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS,
+                                        LANDMARKS_FROM, LANDMARKS_TO)),
+    }
+    if CH is not None:
+        SOLVERS["Contraction Hierarchies"] = (ch_solve, (*CH[0], *CH[1]))
 except Exception as e:
     print(f"❌ Could not load graph: {e}")
     G = None
 
+@lru_cache(maxsize=2048)
+def geocode(query):
+    """ox.geocode, memoized: each miss is a round trip to Nominatim."""
+    return ox.geocode(query)
+
+def timed_solve(solver, graph_args, start_idx, end_idx):
+    """Run one solver kernel; returns (path_idx, visited_idx, elapsed_ms)."""
+    t0 = time.perf_counter()
+    path_idx, visited_idx = solver(*graph_args, start_idx, end_idx)
+    return path_idx, visited_idx, (time.perf_counter() - t0) * 1000
+
+@lru_cache(maxsize=4096)
+def solve_routes(start_idx, end_idx):
+    """
+    Run every solver between two node indices.
+    The kernels release the GIL and only read the shared graph arrays, so
+    they run concurrently on a thread pool.
+    The road graph is static, so results are memoized per (start, end) pair.
+    Returns (results, fastest_algo, path_idx, visited_idx), the last two
+    being the fastest solver's output.
+    """
+    with ThreadPoolExecutor(max_workers=len(SOLVERS)) as ex:
+        futures = {name: ex.submit(timed_solve, solver, graph_args, start_idx, end_idx)
+                   for name, (solver, graph_args) in SOLVERS.items()}
+
+    results = []
+    outputs = {}
+    for name, future in futures.items():
+        path_idx, visited_idx, elapsed_ms = future.result()
+        outputs[name] = (path_idx, visited_idx)
+        results.append({
+            "algo": name,
+            "distance": (round(path_length(CSR_INDPTR, CSR_INDICES, CSR_WEIGHTS, path_idx)/1000, 2)
+                         if len(path_idx) else None),
+            "time": round(elapsed_ms, 2),
+            "visited": len(visited_idx)
+        })
+
+    fastest_algo = min(results, key=lambda r: r["time"])["algo"]
+    return (tuple(results), fastest_algo) + outputs[fastest_algo]
+
 @app.route("/api/compare_routes")
 def compare_routes():
     if G is None:
@@ -43,26 +152,33 @@ def compare_routes():
 
     try:
         print(f"Geocoding '{start}' and '{end}' within Mumbai...")
-        start_point = ox.geocode(start + ", Mumbai, India")
-        end_point = ox.geocode(end + ", Mumbai, India")
+        # Both lookups are network round trips; run them side by side
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            start_future = ex.submit(geocode, start + ", Mumbai, India")
+            end_future = ex.submit(geocode, end + ", Mumbai, India")
+            start_point = start_future.result()
+            end_point = end_future.result()
+
+        # Nearest graph nodes, both snapped in one KD-tree query
+        points = np.radians([start_point, end_point])
+        points[:, 1] *= NODE_TREE_LON_SCALE
+        _, (start_idx, end_idx) = NODE_TREE.query(points[:, ::-1])
 
-        # Nearest graph nodes
-        start_node = ox.distance.nearest_nodes(G, start_point[1], start_point[0])
-        end_node = ox.distance.nearest_nodes(G, end_point[1], end_point[0])
+        results, fastest_algo, path_idx, visited_idx = solve_routes(int(start_idx), int(end_idx))
+        # Every solver is exact, so an empty path means end is unreachable
+        if len(path_idx) == 0:
+            return jsonify({"error": f"No route between '{start}' and '{end}'"}), 404
 
-        # Example: shortest path (Dijkstra for now)
-        path = nx.shortest_path(G, source=start_node, target=end_node, weight="length")
-        path_coords = [(G.nodes[n]["y"], G.nodes[n]["x"]) for n in path]
+        # Animate the fastest solver's search
+        path_coords = np.take(NODE_LATLON, path_idx, axis=0).tolist()
+        visited_coords = np.take(NODE_LATLON, visited_idx, axis=0).tolist()
 
         return jsonify({
-            "results": [
-                {"algo": "Dijkstra", "distance": round(nx.shortest_path_length(G, start_node, end_node, weight="length")/1000, 2),
-                 "time": 0, "visited": len(path)}
-            ],
-            "fastest_algo": "Dijkstra",
+            "results": list(results),
+            "fastest_algo": fastest_algo,
             "animation_data": {
                 "path_coords": path_coords,
-                "visited_coords": path_coords
+                "visited_coords": visited_coords
             }
         })
 
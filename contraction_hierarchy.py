@@ -0,0 +1,147 @@
+"""
+Contraction Hierarchies preprocessing for the CSR road graph.
+
+Nodes are contracted one at a time in edge-difference order. Contracting v
+adds a shortcut u -> w for every u -> v -> w that has no shorter witness
+path avoiding v. Each node keeps the edges it still has when contracted,
+and those all lead to higher-ranked nodes. That gives two upward graphs:
+"up" (outgoing edges) for the forward search and "down" (incoming edges,
+stored reversed) for the backward search. Every edge also records the node
+it bypasses (-1 for real road edges) so query paths can be unpacked.
+"""
+import heapq
+import os
+import tempfile
+
+import numpy as np
+
+# Witness searches give up after settling this many nodes; a missed witness
+# only costs a redundant shortcut, never a wrong answer
+WITNESS_SETTLE_LIMIT = 60
+
+def _witness_distances(out_adj, source, skip, limit):
+    """Bounded Dijkstra from source that never passes through skip."""
+    distances = {source: 0.0}
+    pq = [(0.0, source)]
+    settled = 0
+    while pq and settled < WITNESS_SETTLE_LIMIT:
+        dist, current = heapq.heappop(pq)
+        if dist > limit:
+            break
+        if dist > distances[current]:
+            continue
+        settled += 1
+        for neighbor, length in out_adj[current].items():
+            if neighbor == skip:
+                continue
+            new_dist = dist + length
+            if new_dist < distances.get(neighbor, np.inf):
+                distances[neighbor] = new_dist
+                heapq.heappush(pq, (new_dist, neighbor))
+    return distances
+
+def _shortcuts(out_adj, in_adj, v):
+    """Shortcuts (u, w, length) needed if v were contracted now."""
+    shortcuts = []
+    if not out_adj[v]:
+        return shortcuts
+    max_out = max(out_adj[v].values())
+    for u, w_uv in in_adj[v].items():
+        witness = _witness_distances(out_adj, u, v, w_uv + max_out)
+        for w, w_vw in out_adj[v].items():
+            if w != u and witness.get(w, np.inf) > w_uv + w_vw:
+                shortcuts.append((u, w, w_uv + w_vw))
+    return shortcuts
+
+def _to_csr(n, edges):
+    """Pack (source, target, length, middle) edges into CSR arrays."""
+    edges.sort(key=lambda e: e[0])
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount([e[0] for e in edges], minlength=n), out=indptr[1:])
+    indices = np.array([e[1] for e in edges], dtype=np.int32)
+    weights = np.array([e[2] for e in edges], dtype=np.float32)
+    middle = np.array([e[3] for e in edges], dtype=np.int32)
+    return indptr, indices, weights, middle
+
+def build_ch(indptr, indices, weights):
+    """
+    Contract the CSR graph. Returns the upward graph and the reversed
+    downward graph, each as (indptr, indices, weights, middle) arrays.
+    """
+    n = len(indptr) - 1
+    out_adj = [{} for _ in range(n)]
+    in_adj = [{} for _ in range(n)]
+    for u in range(n):
+        for k in range(indptr[u], indptr[u + 1]):
+            v, length = int(indices[k]), float(weights[k])
+            if v != u and length < out_adj[u].get(v, np.inf):
+                out_adj[u][v] = length
+                in_adj[v][u] = length
+    middle = {}
+    deleted_neighbors = [0] * n
+
+    def priority(v, shortcuts):
+        edge_difference = len(shortcuts) - len(in_adj[v]) - len(out_adj[v])
+        return edge_difference + deleted_neighbors[v]
+
+    pq = [(priority(v, _shortcuts(out_adj, in_adj, v)), v) for v in range(n)]
+    heapq.heapify(pq)
+    up_edges, down_edges = [], []
+    while pq:
+        _, v = heapq.heappop(pq)
+        # Lazy update: contract v only if it is still the cheapest choice
+        shortcuts = _shortcuts(out_adj, in_adj, v)
+        new_priority = priority(v, shortcuts)
+        if pq and new_priority > pq[0][0]:
+            heapq.heappush(pq, (new_priority, v))
+            continue
+
+        for w, length in out_adj[v].items():
+            up_edges.append((v, w, length, middle.get((v, w), -1)))
+            del in_adj[w][v]
+            deleted_neighbors[w] += 1
+        for u, length in in_adj[v].items():
+            down_edges.append((v, u, length, middle.get((u, v), -1)))
+            del out_adj[u][v]
+            deleted_neighbors[u] += 1
+        out_adj[v].clear()
+        in_adj[v].clear()
+
+        for u, w, length in shortcuts:
+            if length < out_adj[u].get(w, np.inf):
+                out_adj[u][w] = length
+                in_adj[w][u] = length
+                middle[(u, w)] = v
+
+    return _to_csr(n, up_edges), _to_csr(n, down_edges)
+
+def save_ch(path, up, down):
+    """
+    Write to a temp file and rename it into place, so a process loading the
+    hierarchy never sees a half-written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, *up, *down)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def load_ch(path):
+    with np.load(path) as data:
+        arrays = [data[f"arr_{i}"] for i in range(8)]
+    return tuple(arrays[:4]), tuple(arrays[4:])
+
+if __name__ == "__main__":
+    # Offline build step: contraction takes minutes on the full Mumbai graph,
+    # far too long to run inside a web worker
+    from graph_store import CH_FILE, build_csr, build_node_arrays, load_graph
+
+    G = load_graph()
+    node_index, _ = build_node_arrays(G)
+    print("Building contraction hierarchy...")
+    up, down = build_ch(*build_csr(G, node_index))
+    save_ch(CH_FILE, up, down)
+    print(f"Contraction hierarchy built and saved to {CH_FILE}.")
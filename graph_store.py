@@ -0,0 +1,60 @@
+"""
+Loading the Mumbai road graph and packing it into arrays.
+
+Shared by the web app and the offline build steps, so a build step can get
+the CSR arrays without importing the Flask app.
+"""
+import os
+
+import numpy as np
+import osmnx as ox
+
+GRAPH_FILE = os.path.join(os.path.dirname(__file__), "mumbai.graphml")
+CH_FILE = os.path.join(os.path.dirname(__file__), "mumbai.ch.npz")
+
+def load_graph():
+    """
+    Load Mumbai road network.
+    If graphml file exists, load it.
+    If not, download and save it for future use.
+    """
+    if os.path.exists(GRAPH_FILE):
+        print(f"Loading graph from {GRAPH_FILE} ...")
+        return ox.load_graphml(GRAPH_FILE)
+    else:
+        print("Graph file not found, downloading from OSM...")
+        G = ox.graph_from_place("Mumbai, India", network_type="drive")
+        ox.save_graphml(G, GRAPH_FILE)
+        print("Graph downloaded and saved.")
+        return G
+
+def build_node_arrays(G):
+    """
+    Index nodes by a contiguous int id and collect their (lat, lon) degrees
+    into an (N, 2) array, used for snapping and for map output without
+    going through the NetworkX node dicts.
+    Returns (node_index, latlon).
+    """
+    node_index = {n: i for i, n in enumerate(G.nodes)}
+    latlon = np.array([(data["y"], data["x"]) for _, data in G.nodes(data=True)], dtype=np.float64)
+    return node_index, latlon
+
+def build_csr(G, node_index, reverse=False):
+    """
+    Pack the road network into CSR arrays (indptr, indices, weights) over the
+    contiguous node ids, so traversal is plain array indexing instead of
+    MultiDiGraph dict-of-dict lookups. Parallel edges are kept as-is.
+    With reverse=True the rows hold incoming edges instead of outgoing ones.
+    """
+    edges = [(node_index[u], node_index[v], length if length is not None else 1.0)
+             for u, v, _, length in G.edges(keys=True, data="length")]
+    src = np.array([e[0] for e in edges], dtype=np.int32)
+    dst = np.array([e[1] for e in edges], dtype=np.int32)
+    wgt = np.array([e[2] for e in edges], dtype=np.float32)
+    if reverse:
+        src, dst = dst, src
+
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(len(node_index) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=len(node_index)), out=indptr[1:])
+    return indptr, dst[order], wgt[order]